@@ -0,0 +1,199 @@
+import os
+import time
+import json
+from datetime import datetime
+
+
+def load_checkpoint(checkpoint_file, excel_file, total_rows, resume=True):
+    """
+    读取断点文件，文件不存在或与当前Excel不匹配时返回空状态
+    Excel只是新增了行时保留已有断点，新增的行会在之后处理
+    :param checkpoint_file: 断点文件路径
+    :param excel_file: Excel文件路径
+    :param total_rows: Excel总行数
+    :param resume: 为False时忽略已有断点，直接返回空状态
+    :return: 断点状态字典
+    """
+    state = {
+        'excel_file': os.path.abspath(excel_file),
+        'total_rows': total_rows,
+        'next_row': 0,
+        'rows': {},
+    }
+    if not resume or not os.path.exists(checkpoint_file):
+        return state
+
+    try:
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠ 断点文件无法读取，从头开始: {str(e)}")
+        return state
+
+    if not isinstance(saved, dict) or saved.get('excel_file') != state['excel_file']:
+        print(f"⚠ 断点文件与当前Excel不匹配，从头开始: {checkpoint_file}")
+        return state
+
+    saved_total = saved.get('total_rows')
+    if not isinstance(saved_total, int) or isinstance(saved_total, bool) or saved_total > total_rows:
+        print(f"⚠ Excel行数与断点记录不一致（{saved_total} -> {total_rows}），从头开始: {checkpoint_file}")
+        return state
+
+    # 检查断点内容是否完整（文件被截断或手动修改时可能缺少字段）
+    next_row = saved.get('next_row')
+    if not isinstance(next_row, int) or isinstance(next_row, bool) or not 0 <= next_row <= saved_total \
+            or not isinstance(saved.get('rows'), dict):
+        print(f"⚠ 断点文件内容不完整，从头开始: {checkpoint_file}")
+        return state
+
+    if saved_total < total_rows:
+        print(f"Excel新增了 {total_rows - saved_total} 行，保留已有断点")
+        saved['total_rows'] = total_rows
+
+    return saved
+
+
+def prepare_resume(excel_file, total_rows, output_dir, checkpoint_file=None, status_excel=None, resume=True):
+    """
+    读取断点并计算本次需要处理的行
+    :param excel_file: Excel文件路径
+    :param total_rows: Excel总行数
+    :param output_dir: 输出目录
+    :param checkpoint_file: 断点文件路径，默认保存在输出目录下的 checkpoint.json
+    :param status_excel: 带状态列的Excel副本路径，不能与原始Excel相同
+    :param resume: 是否从断点继续
+    :return: (断点文件路径, 断点状态字典, 待处理行号列表)，参数错误或没有需要处理的行时返回None
+    """
+    if status_excel and os.path.abspath(status_excel) == os.path.abspath(excel_file):
+        print(f"错误: 状态表路径不能与原始Excel相同: {status_excel}")
+        return None
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    if checkpoint_file is None:
+        checkpoint_file = os.path.join(output_dir, 'checkpoint.json')
+
+    state = load_checkpoint(checkpoint_file, excel_file, total_rows, resume)
+    start_row = state['next_row']
+    row_queue = pending_rows(state, total_rows)
+    retry_count = len(row_queue) - (total_rows - start_row)
+
+    if not row_queue:
+        print(f"断点记录显示全部 {total_rows} 行已处理完成，且没有失败的行 (断点文件: {checkpoint_file})")
+        print("如需重新处理，请使用 resume=False 或删除断点文件")
+        return None
+    if start_row > 0:
+        if start_row < total_rows:
+            print(f"从断点继续: 第 {start_row + 1} 行开始 (断点文件: {checkpoint_file})")
+        if retry_count > 0:
+            print(f"重试之前失败的 {retry_count} 行")
+        print()
+
+    return checkpoint_file, state, row_queue
+
+
+def checkpoint_due(session_done, checkpoint_every):
+    """
+    判断是否到了保存断点的批次
+    :param session_done: 本次已处理行数
+    :param checkpoint_every: 每处理多少行保存一次断点（小于1时按1处理）
+    :return: 是否需要保存
+    """
+    return session_done % max(1, int(checkpoint_every)) == 0
+
+
+def pending_rows(state, total_rows):
+    """
+    计算本次需要处理的行：之前失败或部分失败的行，加上断点之后尚未处理的行
+    :param state: 断点状态字典
+    :param total_rows: Excel总行数
+    :return: 行号列表（从0开始，升序）
+    """
+    next_row = state['next_row']
+    retry_rows = sorted(
+        int(key) for key, record in state['rows'].items()
+        if key.isdigit() and int(key) < next_row
+        and isinstance(record, dict) and record.get('status') in ('failed', 'partial')
+    )
+    return retry_rows + list(range(next_row, total_rows))
+
+
+def save_checkpoint(checkpoint_file, state):
+    """
+    原子写入断点文件（先写临时文件再替换，避免中断时损坏）
+    :param checkpoint_file: 断点文件路径
+    :param state: 断点状态字典
+    """
+    state['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    tmp_file = checkpoint_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def flush_checkpoint(checkpoint_file, state, df, status_excel=None, status_column='状态'):
+    """
+    保存断点文件和状态表副本，写入失败时只打印警告，不中断任务
+    （例如状态表正在被Excel打开导致 PermissionError）
+    状态表需要重写整个Excel，批次保存时传None，只在结束时写入
+    :param checkpoint_file: 断点文件路径
+    :param state: 断点状态字典
+    :param df: 原始数据
+    :param status_excel: 带状态列的Excel副本路径，为None时不生成
+    :param status_column: 状态列的列名
+    """
+    try:
+        save_checkpoint(checkpoint_file, state)
+    except Exception as e:
+        print(f"  ⚠ 断点保存失败: {str(e)}")
+
+    if status_excel:
+        try:
+            write_status_excel(df, state, status_excel, status_column)
+        except Exception as e:
+            print(f"  ⚠ 状态表保存失败（文件可能正在被打开）: {str(e)}")
+
+
+def write_status_excel(df, state, status_excel, status_column='状态'):
+    """
+    将每行的处理状态写入Excel副本的新列中（不修改原始Excel）
+    :param df: 原始数据
+    :param state: 断点状态字典
+    :param status_excel: 输出Excel副本路径
+    :param status_column: 状态列的列名
+    """
+    rows = state['rows']
+    records = [rows.get(str(i), {}) for i in range(len(df))]
+
+    status_df = df.copy()
+    status_df[status_column] = [r.get('status', '') for r in records]
+    status_df['输出路径'] = [r.get('path', '') for r in records]
+    status_df['文件大小(bytes)'] = [r.get('bytes', '') for r in records]
+    status_df['错误信息'] = [r.get('error', '') for r in records]
+    status_df.to_excel(status_excel, index=False)
+
+
+def format_progress(done, total, work_done, session_bytes, start_time):
+    """
+    生成进度行：已完成数、速度（个/秒、MB/秒）和预计剩余时间
+    速度只按实际下载/转换过的行计算，跳过的行和已存在的文件不计入
+    :param done: 本次已处理行数
+    :param total: 本次需要处理的总行数
+    :param work_done: 本次实际下载/转换过的行数
+    :param session_bytes: 本次实际写入的字节数
+    :param start_time: 本次运行开始时间
+    :return: 进度字符串
+    """
+    elapsed = max(time.time() - start_time, 1e-6)
+    jobs_per_sec = work_done / elapsed
+    mb_per_sec = session_bytes / elapsed / (1024 * 1024)
+
+    if jobs_per_sec > 0:
+        eta_seconds = int((total - done) / jobs_per_sec)
+        eta = f"{eta_seconds // 3600:02d}:{eta_seconds % 3600 // 60:02d}:{eta_seconds % 60:02d}"
+    else:
+        eta = "--:--:--"
+
+    percent = done / total * 100 if total else 100.0
+    return (f"进度: {done}/{total} ({percent:.1f}%) | "
+            f"{jobs_per_sec:.2f} 个/秒 | {mb_per_sec:.2f} MB/秒 | 预计剩余 {eta}")
@@ -6,6 +6,7 @@ from urllib.parse import urlparse
 import time
 import json
 from datetime import datetime
+from checkpoint import prepare_resume, checkpoint_due, flush_checkpoint, format_progress
 
 
 def extract_urls(text):
@@ -74,19 +75,27 @@ def download_pdf(url, filename, output_dir='downloads', max_retries=3):
             response = requests.get(url, headers=headers, timeout=30, stream=True)
             response.raise_for_status()
 
-            # 保存文件
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            # 先保存到临时文件，下载完整后再改名，避免中断时留下不完整的文件
+            part_path = filepath + '.part'
+            try:
+                with open(part_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        if chunk:
+                            f.write(chunk)
+            except BaseException:
+                # 下载中断，删除不完整的临时文件
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
 
             # 验证文件是否下载成功
-            if os.path.getsize(filepath) > 0:
+            if os.path.getsize(part_path) > 0:
+                os.replace(part_path, filepath)
                 print(f"✓ 下载成功: {filename}")
                 return True, None
             else:
                 # 文件为空，删除并重试
-                os.remove(filepath)
+                os.remove(part_path)
                 raise Exception("下载的文件为空")
 
         except requests.exceptions.HTTPError as e:
@@ -137,11 +146,16 @@ def download_pdf(url, filename, output_dir='downloads', max_retries=3):
     return False, "所有重试都失败"
 
 
-def main(excel_file, output_dir='downloads'):
+def main(excel_file, output_dir='downloads', checkpoint_file=None, status_excel=None,
+         checkpoint_every=10, resume=True):
     """
     主函数
     :param excel_file: Excel文件路径
     :param output_dir: 输出目录
+    :param checkpoint_file: 断点文件路径，默认保存在输出目录下的 checkpoint.json
+    :param status_excel: 带状态列的Excel副本路径，为None时不生成
+    :param checkpoint_every: 每处理多少行保存一次断点（状态表只在结束时写入）
+    :param resume: 是否从断点继续（False则从头开始并覆盖断点）
     """
     try:
         # 读取Excel文件
@@ -159,62 +173,121 @@ def main(excel_file, output_dir='downloads'):
         col_title = columns[2]  # 第三列
         col_remark = columns[-1]  # 最后一列
 
+        # 读取断点，已完成的行不再重新扫描
+        total_rows = len(df)
+        resume_info = prepare_resume(excel_file, total_rows, output_dir, checkpoint_file, status_excel, resume)
+        if resume_info is None:
+            return
+        checkpoint_file, state, row_queue = resume_info
+
         success_count = 0
         fail_count = 0
         skip_count = 0
         failed_items = []  # 记录失败的项
+        session_done = 0
+        work_done = 0
+        session_bytes = 0
+        start_time = time.time()
 
-        # 遍历每一行
-        for idx, row in df.iterrows():
-            序号 = str(row[col_index])
-            标题 = str(row[col_title])
-            备注 = row[col_remark]
-
-            # 提取备注中的所有链接
-            urls = extract_urls(备注)
-
-            if not urls:
-                print(f"行 {idx + 1}: 序号[{序号}] - 未找到链接，跳过")
-                continue
-
-            print(f"\n行 {idx + 1}: 序号[{序号}] - 标题[{标题}]")
-            print(f"  找到 {len(urls)} 个链接")
-
-            # 下载每个链接
-            for url_idx, url in enumerate(urls, 1):
-                # 构建文件名
-                if len(urls) > 1:
-                    # 多个链接时，添加序号后缀
-                    filename = f"{序号}-{标题}-{url_idx}.pdf"
-                else:
-                    filename = f"{序号}-{标题}.pdf"
-
-                # 清理文件名
-                filename = sanitize_filename(filename)
-
-                print(f"  [{url_idx}/{len(urls)}] 下载: {url}")
-
-                # 下载文件
-                success, error_msg = download_pdf(url, filename, output_dir)
-                if success:
-                    # 判断是否是跳过的文件
-                    if error_msg is None and os.path.exists(os.path.join(output_dir, filename)):
-                        file_existed_before = True  # 这个逻辑可以优化，但当前简化处理
-                    success_count += 1
+        try:
+            # 先重试失败的行，再从断点行开始遍历
+            for idx in row_queue:
+                row = df.iloc[idx]
+                序号 = str(row[col_index])
+                标题 = str(row[col_title])
+                备注 = row[col_remark]
+
+                # 提取备注中的所有链接
+                urls = extract_urls(备注)
+
+                if not urls:
+                    print(f"行 {idx + 1}: 序号[{序号}] - 未找到链接，跳过")
+                    skip_count += 1
+                    row_record = {'status': 'skipped', 'path': '', 'bytes': 0, 'error': '未找到链接'}
                 else:
-                    fail_count += 1
-                    # 记录失败信息
-                    failed_items.append({
-                        '行号': idx + 1,
-                        '序号': 序号,
-                        '标题': 标题,
-                        '链接': url,
-                        '文件名': filename,
-                        '错误': error_msg
-                    })
-
-                # 添加延迟，避免请求过快
-                time.sleep(1)
+                    print(f"\n行 {idx + 1}: 序号[{序号}] - 标题[{标题}]")
+                    print(f"  找到 {len(urls)} 个链接")
+
+                    row_paths = []
+                    row_bytes = 0
+                    row_errors = []
+                    did_work = False
+
+                    # 下载每个链接
+                    for url_idx, url in enumerate(urls, 1):
+                        # 构建文件名
+                        if len(urls) > 1:
+                            # 多个链接时，添加序号后缀
+                            filename = f"{序号}-{标题}-{url_idx}.pdf"
+                        else:
+                            filename = f"{序号}-{标题}.pdf"
+
+                        # 清理文件名
+                        filename = sanitize_filename(filename)
+                        filepath = os.path.join(output_dir, filename)
+
+                        print(f"  [{url_idx}/{len(urls)}] 下载: {url}")
+
+                        # 已存在的文件不会重新下载，不计入速度统计
+                        existed = os.path.exists(filepath) and os.path.getsize(filepath) > 0
+                        if not existed:
+                            did_work = True
+
+                        # 下载文件
+                        success, error_msg = download_pdf(url, filename, output_dir)
+                        if success:
+                            success_count += 1
+                            row_paths.append(filepath)
+                            file_size = os.path.getsize(filepath)
+                            row_bytes += file_size
+                            if not existed:
+                                session_bytes += file_size
+                        else:
+                            fail_count += 1
+                            row_errors.append(f"{url}: {error_msg}")
+                            # 记录失败信息
+                            failed_items.append({
+                                '行号': idx + 1,
+                                '序号': 序号,
+                                '标题': 标题,
+                                '链接': url,
+                                '文件名': filename,
+                                '错误': error_msg
+                            })
+
+                        # 添加延迟，避免请求过快
+                        time.sleep(1)
+
+                    if not row_errors:
+                        row_status = 'success'
+                    elif row_paths:
+                        row_status = 'partial'
+                    else:
+                        row_status = 'failed'
+                    row_record = {
+                        'status': row_status,
+                        'path': '; '.join(row_paths),
+                        'bytes': row_bytes,
+                        'error': '; '.join(row_errors),
+                    }
+                    if did_work:
+                        work_done += 1
+
+                # 更新断点状态，按批次写入文件
+                state['rows'][str(idx)] = row_record
+                state['next_row'] = max(state['next_row'], idx + 1)
+                session_done += 1
+                print(format_progress(session_done, len(row_queue), work_done, session_bytes, start_time))
+
+                if checkpoint_due(session_done, checkpoint_every):
+                    flush_checkpoint(checkpoint_file, state, df)
+
+        finally:
+            # 无论正常结束还是中断，都保存最后的断点（写入失败只警告，不覆盖原始异常）
+            flush_checkpoint(checkpoint_file, state, df, status_excel, '下载状态')
+            print(f"\n断点文件: {checkpoint_file}")
+            if status_excel:
+                print(f"状态表: {status_excel}")
 
         # 保存失败记录
         if failed_items:
@@ -248,6 +321,7 @@ def main(excel_file, output_dir='downloads'):
         print(f"下载完成!")
         print(f"成功: {success_count} 个")
         print(f"失败: {fail_count} 个")
+        print(f"跳过: {skip_count} 行（无链接）")
         if fail_count > 0:
             print(f"  提示: 失败的文件已记录在 failed_downloads_*.txt 中，可以后续手动处理")
         print(f"文件保存在: {output_dir}")
@@ -262,5 +336,8 @@ if __name__ == "__main__":
     # 使用示例
     excel_file = "总数据.xlsx"  # 替换为你的Excel文件路径
     output_dir = "downloads"  # 输出目录
+    status_excel = "总数据_下载状态.xlsx"  # 带状态列的Excel副本，不需要可设为None
 
-    main(excel_file, output_dir)
\ No newline at end of file
+    # 中断后重新运行会从 downloads/checkpoint.json 记录的行继续，并重试之前失败的行
+    # 如需忽略断点从头开始，可传入 resume=False
+    main(excel_file, output_dir, status_excel=status_excel)
\ No newline at end of file
@@ -11,6 +11,7 @@ from selenium.webdriver.common.by import By
 import base64
 import json
 from urllib.parse import urlparse
+from checkpoint import prepare_resume, checkpoint_due, flush_checkpoint, format_progress
 
 
 def sanitize_filename(filename):
@@ -192,7 +193,7 @@ def save_page_as_pdf(driver, url, output_path, wait_time=5, max_retries=2):
     :param output_path: 输出PDF路径
     :param wait_time: 页面加载等待时间（秒）
     :param max_retries: 最大重试次数
-    :return: 是否成功
+    :return: (成功与否, 错误信息)
     """
     for attempt in range(max_retries):
         try:
@@ -250,7 +251,7 @@ def save_page_as_pdf(driver, url, output_path, wait_time=5, max_retries=2):
                 f.write(base64.b64decode(result['data']))
 
             print(f"  ✓ 转换成功")
-            return True
+            return True, None
 
         except Exception as e:
             print(f"  ✗ 转换失败 (尝试 {attempt + 1}/{max_retries})")
@@ -260,10 +261,14 @@ def save_page_as_pdf(driver, url, output_path, wait_time=5, max_retries=2):
                 print("  等待5秒后重试...")
                 time.sleep(5)
             else:
-                return False
+                return False, str(e)
 
+    # 如果所有重试都失败
+    return False, "所有重试都失败"
 
-def main(excel_file, output_dir='html_pdfs', url_column_name='来源网址', wait_time=8, proxy_settings=None):
+
+def main(excel_file, output_dir='html_pdfs', url_column_name='来源网址', wait_time=8, proxy_settings=None,
+         checkpoint_file=None, status_excel=None, checkpoint_every=10, resume=True):
     """
     主函数
     :param excel_file: Excel文件路径
@@ -271,6 +276,10 @@ def main(excel_file, output_dir='html_pdfs', url_column_name='来源网址', wai
     :param url_column_name: URL列的列名
     :param wait_time: 每个页面的等待加载时间（秒），访问国外网站建议增加
     :param proxy_settings: 代理设置
+    :param checkpoint_file: 断点文件路径，默认保存在输出目录下的 checkpoint.json
+    :param status_excel: 带状态列的Excel副本路径，为None时不生成
+    :param checkpoint_every: 每处理多少行保存一次断点（状态表只在结束时写入）
+    :param resume: 是否从断点继续（False则从头开始并覆盖断点）
     """
     try:
         # 读取Excel文件
@@ -295,53 +304,92 @@ def main(excel_file, output_dir='html_pdfs', url_column_name='来源网址', wai
 
         col_url = url_column_name
 
+        # 读取断点，已完成的行不再重新扫描
+        total_rows = len(df)
+        resume_info = prepare_resume(excel_file, total_rows, output_dir, checkpoint_file, status_excel, resume)
+        if resume_info is None:
+            return
+        checkpoint_file, state, row_queue = resume_info
+
         # 初始化浏览器（带代理）
         print("正在启动浏览器...\n")
         driver = setup_driver(output_dir, proxy_settings)
 
         success_count = 0
         fail_count = 0
+        skip_count = 0
+        session_done = 0
+        work_done = 0
+        session_bytes = 0
+        start_time = time.time()
 
         try:
-            # 遍历每一行
-            for idx, row in df.iterrows():
+            # 先重试失败的行，再从断点行开始遍历
+            for idx in row_queue:
+                row = df.iloc[idx]
                 序号 = str(row[col_index])
                 标题 = str(row[col_title])
                 网址 = row[col_url]
 
                 # 检查URL是否有效
                 if pd.isna(网址) or not str(网址).startswith('http'):
-                    print(f"行 {idx + 1}: 序号[{序号}] - 无效的URL，跳过\n")
-                    continue
-
-                print(f"行 {idx + 1}: 序号[{序号}] - 标题[{标题}]")
-
-                # 构建文件名
-                filename = f"{序号}-{标题}.pdf"
-                filename = sanitize_filename(filename)
-                output_path = os.path.join(output_dir, filename)
-
-                # 转换为PDF
-                if save_page_as_pdf(driver, str(网址), output_path, wait_time):
-                    success_count += 1
+                    print(f"行 {idx + 1}: 序号[{序号}] - 无效的URL，跳过")
+                    skip_count += 1
+                    row_record = {'status': 'skipped', 'path': '', 'bytes': 0, 'error': '无效的URL'}
                 else:
-                    fail_count += 1
-
+                    print(f"行 {idx + 1}: 序号[{序号}] - 标题[{标题}]")
+
+                    # 构建文件名
+                    filename = f"{序号}-{标题}.pdf"
+                    filename = sanitize_filename(filename)
+                    output_path = os.path.join(output_dir, filename)
+
+                    # 转换为PDF
+                    success, error_msg = save_page_as_pdf(driver, str(网址), output_path, wait_time)
+                    work_done += 1
+                    if success:
+                        success_count += 1
+                        row_bytes = os.path.getsize(output_path)
+                        row_record = {'status': 'success', 'path': output_path, 'bytes': row_bytes, 'error': ''}
+                        session_bytes += row_bytes
+                    else:
+                        fail_count += 1
+                        row_record = {'status': 'failed', 'path': '', 'bytes': 0, 'error': error_msg}
+
+                    # 添加延迟，避免请求过快
+                    time.sleep(2)
+
+                # 更新断点状态，按批次写入文件
+                state['rows'][str(idx)] = row_record
+                state['next_row'] = max(state['next_row'], idx + 1)
+                session_done += 1
+                print(format_progress(session_done, len(row_queue), work_done, session_bytes, start_time))
                 print()  # 空行分隔
 
-                # 添加延迟，避免请求过快
-                time.sleep(2)
+                if checkpoint_due(session_done, checkpoint_every):
+                    flush_checkpoint(checkpoint_file, state, df)
 
         finally:
-            # 关闭浏览器
-            driver.quit()
-            print("浏览器已关闭\n")
+            # 无论正常结束还是中断，都先保存最后的断点（写入失败只警告，不覆盖原始异常）
+            flush_checkpoint(checkpoint_file, state, df, status_excel, '转换状态')
+            print(f"断点文件: {checkpoint_file}")
+            if status_excel:
+                print(f"状态表: {status_excel}")
+            print()
+
+            # 关闭浏览器（Ctrl+C时浏览器可能已经退出）
+            try:
+                driver.quit()
+                print("浏览器已关闭\n")
+            except Exception as e:
+                print(f"  ⚠ 关闭浏览器失败: {str(e)}\n")
 
         # 打印统计信息
         print(f"{'=' * 50}")
         print(f"转换完成!")
         print(f"成功: {success_count} 个")
         print(f"失败: {fail_count} 个")
+        print(f"跳过: {skip_count} 行（无效URL）")
         print(f"文件保存在: {output_dir}")
 
     except Exception as e:
@@ -400,9 +448,14 @@ if __name__ == "__main__":
     # 访问国外网站建议增加等待时间
     wait_time = 8
 
+    # 带状态列的Excel副本，不需要可设为None
+    status_excel = "总数据_转换状态.xlsx"
+
     print("代理配置信息:")
     print(f"类型: {proxy_settings['proxy_type']}")
     print(f"地址: {proxy_settings['host']}:{proxy_settings['port']}")
     print(f"等待时间: {wait_time}秒\n")
 
-    main(excel_file, output_dir, url_column_name, wait_time, proxy_settings)
\ No newline at end of file
+    # 中断后重新运行会从 html_pdfs/checkpoint.json 记录的行继续，并重试之前失败的行
+    # 如需忽略断点从头开始，可传入 resume=False
+    main(excel_file, output_dir, url_column_name, wait_time, proxy_settings, status_excel=status_excel)
\ No newline at end of file